@@ -1,13 +1,19 @@
 from flask import Flask
 from config import Config
-from app.extensions import db
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateIndex
+from app.extensions import db, configure_sqlite
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    _drop_pool_sizing_for_memory_sqlite(app)
 
     # Initialize Flask extensions
     db.init_app(app)
+    with app.app_context():
+        configure_sqlite(db.engine, wal=app.config.get('SQLITE_WAL', False))
 
     # Register Blueprints
     from app.routes import main, admin, auth
@@ -15,11 +21,18 @@ def create_app(config_class=Config):
     app.register_blueprint(admin.bp) # admin routes usually are root or /admin? Original was root.
     app.register_blueprint(auth.bp) # login logic
 
+    # Compile every template up front so the first request to each page in a
+    # fresh worker doesn't pay for it. Flask already disables auto_reload
+    # (the per-render mtime check) unless running in debug mode.
+    for template in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(template)
+
     # Create tables if they don't exist
     # Note: In production we should use migrations. 
     # For now, auto-create on start if using sqlite/dev
     with app.app_context():
         db.create_all()
+        create_missing_indexes()
 
     # CLI commands
     from app.models import Match, Player, Appearance
@@ -29,6 +42,40 @@ def create_app(config_class=Config):
     def init_db_command():
         """Create all database tables."""
         db.create_all()
+        create_missing_indexes()
         print('Initialized the database.')
 
     return app
+
+def _drop_pool_sizing_for_memory_sqlite(app):
+    """Remove QueuePool-only engine options when the database is in-memory SQLite."""
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    in_memory = url.get_backend_name() == 'sqlite' and (
+        url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory')
+    if in_memory:
+        options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        options.pop('pool_size', None)
+        options.pop('max_overflow', None)
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+def create_missing_indexes():
+    """Create indexes declared on the models that an existing database lacks.
+
+    db.create_all() only creates indexes along with new tables, so databases
+    created before an index was added would otherwise never get it. When any
+    index is added the tables are re-analyzed so the planner knows to use it.
+    """
+    inspector = inspect(db.engine)
+    created = False
+    for table in db.metadata.sorted_tables:
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                # IF NOT EXISTS: workers starting together may all see the
+                # index as missing, and only one of them gets to create it
+                with db.engine.begin() as conn:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+                created = True
+    if created:
+        with db.engine.begin() as conn:
+            conn.execute(text('ANALYZE'))
@@ -1,3 +1,34 @@
+import sqlite3
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
 db = SQLAlchemy()
+
+
+def configure_sqlite(engine, wal=False):
+    """Tune each new SQLite connection on engine; other backends are left alone.
+
+    The rollback journal is the default because WAL needs shared memory that
+    network filesystems don't provide. Where the database is on local disk,
+    wal=True lets readers carry on while a teamsheet is being saved, and with
+    WAL synchronous=NORMAL is still safe against corruption while skipping the
+    fsync on every commit.
+    """
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_conn, connection_record):
+        if not isinstance(dbapi_conn, sqlite3.Connection):
+            return
+        cur = dbapi_conn.cursor()
+        # wait briefly for a concurrent writer instead of failing with
+        # 'database is locked', without holding a request for long
+        cur.execute('PRAGMA busy_timeout=5000')
+        # journal_mode is stored in the file, so set it either way to switch
+        # back a database that was opened in WAL mode before
+        if wal:
+            cur.execute('PRAGMA journal_mode=WAL')
+            cur.execute('PRAGMA synchronous=NORMAL')
+        else:
+            cur.execute('PRAGMA journal_mode=DELETE')
+        cur.execute('PRAGMA cache_size=-20000')
+        cur.execute('PRAGMA temp_store=MEMORY')
+        cur.close()
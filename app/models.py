@@ -3,13 +3,16 @@ from app.extensions import db
 class Player(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
-    appearances = db.relationship('Appearance', back_populates='player', lazy='dynamic')
+    appearances = db.relationship('Appearance', back_populates='player', lazy='raise')
 
 class Match(db.Model):
+    # (season, date) serves season filters and the season page's date ordering
+    __table_args__ = (db.Index('ix_match_season_date', 'season', 'date'),)
+
     id = db.Column(db.Integer, primary_key=True)
     league = db.Column(db.String(100))
     season = db.Column(db.String(20))
-    date = db.Column(db.Date, nullable=False)
+    date = db.Column(db.Date, nullable=False, index=True)
     opposition = db.Column(db.String(100))
     location = db.Column(db.String(50))
     result = db.Column(db.String(20))
@@ -18,6 +21,14 @@ class Match(db.Model):
     appearances = db.relationship('Appearance', back_populates='match', cascade="all, delete-orphan", lazy='select')
 
 class Appearance(db.Model):
+    # (match_id, position) serves per-match teamsheet scans and match_id lookups;
+    # (player_id, match_id, position) covers player lookups, the player -> match
+    # join and the starts/bench counts, so /stats never reads the table itself
+    __table_args__ = (
+        db.Index('ix_appearance_match_position', 'match_id', 'position'),
+        db.Index('ix_appearance_player_match_position', 'player_id', 'match_id', 'position'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
     match_id = db.Column(db.Integer, db.ForeignKey('match.id'), nullable=False)
@@ -1,23 +1,29 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort
 from app.extensions import db
 from app.models import Match, Player, Appearance
 from app.utils import admin_required, parse_date_safe
-from app.services import find_potential_duplicates, _collect_seasons
-from app.services import find_potential_duplicates, _collect_seasons
+from app.services import find_potential_duplicates, find_duplicate_groups, get_all_player_names
+from app.services.cache import memoize_on_data
 
-from sqlalchemy import func
+from sqlalchemy import func, insert
+from sqlalchemy.orm import selectinload
 from collections import Counter
 
 bp = Blueprint('admin', __name__)
 
+@memoize_on_data
 def get_most_recent_teamsheet_from_db():
+    """Form defaults from the latest match. Cached until the database changes."""
     defaults = {
         'league': '', 'season': '', 'date': '', 'opposition': '', 'location': '',
         'result': '', 'guildford_points': '', 'opposition_points': '',
         'players': [''] * 20
     }
     
-    last_match = Match.query.order_by(Match.date.desc()).first()
+    last_match = Match.query\
+        .options(selectinload(Match.appearances).joinedload(Appearance.player))\
+        .order_by(Match.date.desc())\
+        .first()
     if not last_match:
         return defaults
 
@@ -42,37 +48,43 @@ def _process_teamsheet_form(form_data, match_obj=None):
     player_names = [form_data.get(f'player{i}', '').strip() for i in range(1, 21)]
 
     non_empty_players = [name for name in player_names if name]
-    player_counts = Counter(non_empty_players)
-    duplicates = [name for name, count in player_counts.items() if count > 1]
-    if duplicates:
+    # a set length check is enough to accept a clean sheet; the Counter that
+    # names the duplicates is only built when there are some
+    if len(set(non_empty_players)) != len(non_empty_players):
+        duplicates = [name for name, count in Counter(non_empty_players).items() if count > 1]
         flash(f'The teamsheet contains duplicate players: {", ".join(duplicates)}. Please correct and resubmit.', 'error')
         return None
 
-    all_player_names_in_db = [p.name for p in Player.query.all()]
-    fuzzy_errors = find_potential_duplicates(non_empty_players, all_player_names_in_db)
-    if fuzzy_errors:
-        for error in fuzzy_errors:
-            flash(error, 'error')
-        return None
+    # name -> id for the submitted players in one IN query; plain tuples avoid
+    # building Player objects for names that already exist
+    player_ids = dict(db.session.query(Player.name, Player.id).filter(Player.name.in_(non_empty_players)).all())
+
+    # Only names not already in the database need the fuzzy check, and the
+    # full name list is only fetched when there are some
+    unknown_players = [name for name in non_empty_players if name not in player_ids]
+    if unknown_players:
+        fuzzy_errors = find_potential_duplicates(unknown_players, get_all_player_names())
+        if fuzzy_errors:
+            for error in fuzzy_errors:
+                flash(error, 'error')
+            return None
 
     if match_obj:
         Appearance.query.filter_by(match_id=match_obj.id).delete()
 
-    for i, name in enumerate(player_names):
-        if not name:
-            continue
-        
-        player = Player.query.filter_by(name=name).first()
-        if not player:
-            player = Player(name=name)
-            db.session.add(player)
-        
-        appearance = Appearance(
-            player=player, 
-            match=match_obj, 
-            position=i + 1
-        )
-        db.session.add(appearance)
+    new_players = [Player(name=name) for name in unknown_players]
+    db.session.add_all(new_players)
+    # assigns ids to the new players and, when adding, to the new match
+    db.session.flush()
+    player_ids.update((p.name, p.id) for p in new_players)
+
+    # plain rows through a bulk INSERT; the ORM never tracks the appearances
+    appearance_rows = [
+        {'player_id': player_ids[name], 'match_id': match_obj.id, 'position': i + 1}
+        for i, name in enumerate(player_names) if name
+    ]
+    if appearance_rows:
+        db.session.execute(insert(Appearance), appearance_rows)
     
     return True
 
@@ -123,7 +135,11 @@ def add_post():
 @bp.route('/edit/<int:match_id>', methods=['GET', 'POST'])
 @admin_required
 def edit_match(match_id):
-    match = Match.query.get_or_404(match_id)
+    query = Match.query
+    if request.method == 'GET':
+        # The form lists every player, so fetch appearances and players up front
+        query = query.options(selectinload(Match.appearances).joinedload(Appearance.player))
+    match = query.filter_by(id=match_id).first_or_404()
 
     if request.method == 'POST':
         match.league = request.form.get('league', '').strip()
@@ -157,17 +173,20 @@ def edit_match(match_id):
 @bp.route('/delete/<int:match_id>', methods=['POST'])
 @admin_required
 def delete_match(match_id):
-    match = Match.query.get_or_404(match_id)
-    db.session.delete(match)
+    # Two bulk DELETEs rather than loading the match and cascading one DELETE
+    # per appearance through the ORM
+    Appearance.query.filter_by(match_id=match_id).delete()
+    if not Match.query.filter_by(id=match_id).delete():
+        db.session.rollback()
+        abort(404)
     db.session.commit()
     flash('Match deleted successfully.', 'success')
     return redirect(url_for('main.data_view'))
 
-@bp.route('/player_names', methods=['GET'])
-@admin_required
-def player_names():
+@memoize_on_data
+def get_player_name_counts():
+    """Autocomplete data for the teamsheet form. Cached until the database changes."""
     # Return list of {name, count} for all players
-    # We can use a group by query or just iterate if dataset is small. 
     # Use database aggregation for efficiency.
     stats = db.session.query(Player.name, func.count(Appearance.id))\
         .outerjoin(Appearance)\
@@ -176,44 +195,34 @@ def player_names():
         .all()
     
     # stats is list of (name, count)
-    data = [{'name': name, 'count': count} for name, count in stats]
-    return jsonify(data)
+    return [{'name': name, 'count': count} for name, count in stats]
+
+@bp.route('/player_names', methods=['GET'])
+@admin_required
+def player_names():
+    response = jsonify(get_player_name_counts())
+    # Browsers revalidate with the ETag on every form load and get an empty
+    # 304 back while the roster is unchanged
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.add_etag()
+    return response.make_conditional(request)
 
 @bp.route('/duplicates')
 @admin_required
 def view_duplicates():
     threshold = 80 
-    players = Player.query.order_by(Player.name).all()
-    all_player_names = [p.name for p in players]
-    
-    # We can probably move this logic to logic.py/services.py if we want, but for now it's fine
-    from thefuzz import process as fuzz_process, fuzz
-    duplicate_groups_of_names = []
-    processed_names = set()
-
-    for name in all_player_names:
-        if name in processed_names:
-            continue
-        matches = fuzz_process.extract(name, all_player_names, scorer=fuzz.token_sort_ratio)
-        current_group = {m[0] for m in matches if m[1] >= threshold}
-        
-        if len(current_group) > 1:
-            duplicate_groups_of_names.append(sorted(list(current_group)))
-            processed_names.update(current_group)
-            
-    detailed_groups = []
-    all_names_in_groups = {name for group in duplicate_groups_of_names for name in group}
+    duplicate_groups_of_names = find_duplicate_groups(threshold)
 
-    if all_names_in_groups:
-        player_stats_map = {}
-        stats_query = db.session.query(Player.name, func.count(Appearance.id)).join(Appearance).filter(Player.name.in_(all_names_in_groups)).group_by(Player.name).all()
-        for name, count in stats_query:
-            player_stats_map[name] = {'name': name, 'total': count}
+    detailed_groups = []
+    if duplicate_groups_of_names:
+        # appearance counts from the same cached query the autocomplete uses
+        player_totals = {p['name']: p['count'] for p in get_player_name_counts()}
 
         for group in duplicate_groups_of_names:
             detailed_group = []
             for name in group:
-                detailed_group.append(player_stats_map.get(name, {'name': name, 'total': 0}))
+                detailed_group.append({'name': name, 'total': player_totals.get(name, 0)})
             detailed_groups.append(detailed_group)
     return render_template('duplicates.html', detailed_groups=detailed_groups)
 
@@ -226,7 +235,17 @@ def merge_form():
         return redirect(url_for('admin.view_duplicates'))
 
     player_names = [name.strip() for name in player_names_str.split(',') if name.strip()]
-    players_in_group = Player.query.filter(Player.name.in_(player_names)).all()
+    # Players with their appearance counts in one grouped query, rather than a
+    # COUNT per player from the template
+    rows = db.session.query(Player, func.count(Appearance.id))\
+        .outerjoin(Appearance)\
+        .filter(Player.name.in_(player_names))\
+        .group_by(Player.id)\
+        .all()
+    players_in_group = []
+    for player, count in rows:
+        player.app_count = count
+        players_in_group.append(player)
 
     if len(players_in_group) < 2:
         flash('A merge operation requires at least two players.', 'info')
@@ -238,27 +257,31 @@ def merge_form():
 @bp.route('/merge', methods=['POST'])
 @admin_required
 def merge_players():
-    names_to_merge = request.form.getlist('names_to_merge')
-    canonical_name = request.form.get('canonical_name')
+    ids_to_merge = {int(i) for i in request.form.getlist('ids_to_merge') if i.isdigit()}
+    canonical_id = request.form.get('canonical_id', '')
+    canonical_id = int(canonical_id) if canonical_id.isdigit() else None
 
-    if not canonical_name or not names_to_merge or len(names_to_merge) < 1:
+    if canonical_id is None or not ids_to_merge:
         flash('You must select a correct name and at least one player to merge.', 'error')
         return redirect(request.referrer or url_for('admin.view_duplicates'))
 
-    if canonical_name not in names_to_merge:
+    if canonical_id not in ids_to_merge:
         flash('The selected correct name must be one of the players being merged.', 'error')
         return redirect(request.referrer)
 
-    canonical_player = Player.query.filter_by(name=canonical_name).first()
-    players_to_remove = Player.query.filter(Player.name.in_(names_to_merge), Player.name != canonical_name).all()
+    canonical_name = db.session.query(Player.name).filter_by(id=canonical_id).scalar()
+    if canonical_name is None:
+        abort(404)
 
-    for player in players_to_remove:
-        # Re-assign all appearances
-        Appearance.query.filter_by(player_id=player.id).update({'player_id': canonical_player.id})
-        db.session.delete(player)
+    # Re-assign all appearances and drop the merged players by primary key:
+    # two statements however many players are in the group
+    ids_to_remove = ids_to_merge - {canonical_id}
+    Appearance.query.filter(Appearance.player_id.in_(ids_to_remove))\
+        .update({'player_id': canonical_id}, synchronize_session=False)
+    removed = Player.query.filter(Player.id.in_(ids_to_remove)).delete(synchronize_session=False)
 
     db.session.commit()
-    flash(f'Successfully merged {len(players_to_remove)} player(s) into "{canonical_name}".', 'success')
+    flash(f'Successfully merged {removed} player(s) into "{canonical_name}".', 'success')
     return redirect(url_for('admin.view_duplicates'))
 
 
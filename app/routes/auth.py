@@ -1,8 +1,13 @@
 from flask import Blueprint, render_template, request, session, redirect, url_for, flash
+import hashlib
+import hmac
 import os
 
 bp = Blueprint('auth', __name__)
 
+def _digest(value):
+    return hashlib.sha256(value.encode('utf-8')).digest()
+
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
     # simple admin login (credentials can be set via env vars ADMIN_USER and ADMIN_PASS)
@@ -14,7 +19,11 @@ def login():
         admin_user = current_app.config.get('ADMIN_USER', 'admin')
         admin_pass = current_app.config.get('ADMIN_PASS', 'password')
         
-        if user == admin_user and pw == admin_pass:
+        # compare fixed-length digests in constant time, checking both fields
+        # every time so timing reveals neither which field nor how much matched
+        user_ok = hmac.compare_digest(_digest(user), _digest(admin_user))
+        pass_ok = hmac.compare_digest(_digest(pw), _digest(admin_pass))
+        if user_ok & pass_ok:
             session['admin'] = True
             # Validate next_url to minimize open redirect vulnerability? 
             # For now keep existing behavior but adapt for blueprints if needed.
@@ -1,12 +1,14 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, stream_template, request, redirect, url_for, flash, get_flashed_messages
 from app.extensions import db
 from app.models import Player, Match, Appearance
 from app.services import compute_season_stats, get_player_stats, _collect_seasons
-from sqlalchemy import func, case
+from app.services.cache import cache_response
+from sqlalchemy import func
 
 bp = Blueprint('main', __name__)
 
 @bp.route('/', methods=['GET'])
+@cache_response
 def index():
     # Per plan for Phase 1, just partial parity but moving towards Dashboard
     # Task says: "Instead of redirecting to /add ... create a Dashboard"
@@ -20,25 +22,25 @@ def index():
     return render_template('index.html', recent_matches=recent_matches, total_players=total_players, total_matches=total_matches)
 
 @bp.route('/stats', methods=['GET'])
+@cache_response
 def stats():
     sort_by = request.args.get('sort', 'total')
     order = request.args.get('order', 'desc')
     search_query = request.args.get('search', '')
     show_all = request.args.get('show') == 'all'
 
-    starts_case = case((Appearance.position <= 15, 1), else_=0)
-    bench_case = case((Appearance.position > 15, 1), else_=0)
-
+    # COUNT(...) FILTER (WHERE ...) needs SQLite 3.30+
     total_col = func.count(Appearance.id).label('total')
-    starts_col = func.sum(starts_case).label('starts')
-    bench_col = func.sum(bench_case).label('bench')
+    starts_col = func.count(Appearance.id).filter(Appearance.position <= 15).label('starts')
+    bench_col = func.count(Appearance.id).filter(Appearance.position > 15).label('bench')
 
     query = db.session.query(
+        Player.id,
         Player.name,
         total_col,
         starts_col,
         bench_col
-    ).join(Appearance).group_by(Player.name)
+    ).join(Appearance, Appearance.player_id == Player.id).group_by(Player.id, Player.name)
 
     if search_query:
         query = query.filter(Player.name.ilike(f'%{search_query}%'))
@@ -55,6 +57,9 @@ def stats():
         query = query.order_by(sort_column.asc())
     else:
         query = query.order_by(sort_column.desc())
+    # Break ties by name so equal counts (and the top-100 cut-off) are stable
+    if sort_column is not Player.name:
+        query = query.order_by(Player.name.asc())
 
     if not show_all:
         query = query.limit(100)
@@ -64,13 +69,40 @@ def stats():
 
 @bp.route('/data', methods=['GET'])
 def data_view():
-    matches = Match.query.order_by(Match.date.desc()).all()
-    # Explicitly count appearances to avoid template lazy loading issues
-    for m in matches:
-        m.app_count = len(m.appearances)
-    return render_template('data.html', matches=matches)
+    has_matches = db.session.query(Match.id).first() is not None
+
+    # Appearance count per match as a correlated subquery (served by the
+    # match_id index) instead of loading every match's appearances collection
+    app_count = db.session.query(func.count(Appearance.id))\
+        .filter(Appearance.match_id == Match.id)\
+        .correlate(Match)\
+        .scalar_subquery()
+
+    # Only the columns the table shows, as plain rows rather than Match objects
+    query = db.session.query(
+        Match.id,
+        Match.date,
+        Match.season,
+        Match.opposition,
+        Match.result,
+        Match.guildford_points,
+        Match.opposition_points,
+        app_count.label('app_count')
+    ).order_by(Match.date.desc())
+
+    def iter_matches():
+        # Stream rows in chunks so the page starts sending before the whole
+        # history is loaded, and only one chunk is held in memory at a time
+        yield from query.yield_per(500)
+
+    # The session cookie goes out before the streamed body is rendered, so
+    # pop pending flashes now; base.html's get_flashed_messages() then reads
+    # them from the request rather than leaving them in the session
+    get_flashed_messages()
+    return stream_template('data.html', matches=iter_matches(), has_matches=has_matches)
 
 @bp.route('/season', methods=['GET'])
+@cache_response
 def season_view():
     # Needed to fetch seasons for default if param missing
     all_seasons = _collect_seasons()
@@ -79,13 +111,14 @@ def season_view():
         return redirect(url_for('main.stats'))
     
     season = request.args.get('season') or all_seasons[0]
-    stats = compute_season_stats(season)
+    stats = compute_season_stats(season, all_seasons)
     if stats is None:
         flash('No data for that season', 'error')
         return redirect(url_for('main.stats'))
     return render_template('season.html', stats=stats)
 
 @bp.route('/player', methods=['GET'])
+@cache_response
 def player_view():
     name = request.args.get('name')
     if not name:
@@ -1 +1 @@
-from .core import _collect_seasons, compute_season_stats, get_player_stats, find_potential_duplicates, get_previous_season
+from .core import _collect_seasons, compute_season_stats, get_player_stats, find_potential_duplicates, find_duplicate_groups, get_previous_season, get_all_player_names
@@ -0,0 +1,112 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import request, session
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.extensions import db
+
+# Bumped on every commit in this process. Other processes writing to the same
+# SQLite file are picked up through the file signature below; for other
+# backends their writes can't be seen, so nothing is cached there.
+_generation = 0
+_lock = threading.Lock()
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_generation(session):
+    global _generation
+    with _lock:
+        _generation += 1
+
+
+def _db_file_signature():
+    """Return (mtime, size) of the SQLite file and its WAL, or None for other backends."""
+    url = db.engine.url
+    if url.get_backend_name() != 'sqlite':
+        return None
+    if not url.database or url.database == ':memory:':
+        # only this process can write to it, so the commit generation is enough
+        return ()
+    sig = []
+    for path in (url.database, url.database + '-wal'):
+        try:
+            st = os.stat(path)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append(None)
+    return tuple(sig)
+
+
+def data_version():
+    """Key identifying the current state of the database for cache lookups.
+
+    None when commits from other processes can't be detected, in which case
+    callers must not cache.
+    """
+    signature = _db_file_signature()
+    if signature is None:
+        return None
+    return (_generation, signature)
+
+
+def memoize_on_data(f):
+    """Cache f's result per argument tuple until the database changes.
+
+    Cached values are shared between requests, so callers must not mutate them.
+    When data_version() can't see the database's state every call runs f.
+    """
+    results = {}
+
+    @wraps(f)
+    def wrapper(*args):
+        version = data_version()
+        if version is None:
+            return f(*args)
+        with _lock:
+            hit = results.get(args)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+        value = f(*args)
+        with _lock:
+            results[args] = (version, value)
+        return value
+
+    wrapper.cache_clear = results.clear
+    return wrapper
+
+
+_responses = OrderedDict()
+RESPONSE_CACHE_SIZE = 128
+
+
+def cache_response(f):
+    """Cache a view's rendered HTML per URL and login state until the database changes.
+
+    Requests with pending flash messages bypass the cache so the messages are
+    shown (and consumed) exactly once, as do all requests when data_version()
+    can't see the database's state. Only plain rendered pages are stored;
+    redirects and other responses always run the view.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        version = data_version()
+        if version is None or '_flashes' in session:
+            return f(*args, **kwargs)
+        key = (request.endpoint, request.full_path, bool(session.get('admin')))
+        with _lock:
+            hit = _responses.get(key)
+            if hit is not None and hit[0] == version:
+                _responses.move_to_end(key)
+                return hit[1]
+        rv = f(*args, **kwargs)
+        if isinstance(rv, str):
+            with _lock:
+                _responses[key] = (version, rv)
+                _responses.move_to_end(key)
+                while len(_responses) > RESPONSE_CACHE_SIZE:
+                    _responses.popitem(last=False)
+        return rv
+
+    return wrapper
@@ -1,9 +1,15 @@
 import re
+import sys
 from app.extensions import db
 from app.models import Match, Player, Appearance
-from sqlalchemy import func, case
+from sqlalchemy import func, select
 from collections import Counter
-from thefuzz import process as fuzz_process, fuzz
+import numpy as np
+from rapidfuzz import process as fuzz_process, fuzz, utils as fuzz_utils
+from app.services.cache import memoize_on_data
+
+# Season labels like '2015-16' or '2015-2016'
+_SEASON_RE = re.compile(r'^\s*(\d{4})\s*-\s*(\d{2,4})\s*$')
 
 def get_previous_season(season, all_seasons):
     """
@@ -18,117 +24,143 @@ def get_previous_season(season, all_seasons):
 
     if prev_season is None:
         try:
-            m = re.match(r'^\s*(\d{4})\s*-\s*(\d{2,4})\s*$', season)
+            m = _SEASON_RE.match(season)
             if m:
                 start = int(m.group(1))
                 prev_start = start - 1
                 prev_end = (prev_start + 1) % 100
-                candidate = f"{prev_start}-{prev_end:02d}"
-                if all_seasons and candidate in all_seasons:
-                    prev_season = candidate
-                else:
-                    prev_season = candidate # simplified assumption
+                prev_season = f"{prev_start}-{prev_end:02d}"
         except Exception:
             pass
     return prev_season
 
-def _collect_seasons(matches=None):
-    if matches is None:
-        # Query distinct seasons from the Match table
-        seasons_query = db.session.query(Match.season).distinct().all()
-        seasons = [s[0] for s in seasons_query if s[0]]
-    else:
-        # If matches provided, extract from them (legacy behavior mostly)
-        seasons = list(set(m.season for m in matches if m.season))
+def _collect_seasons():
+    return list(_all_seasons())
+
+@memoize_on_data
+def _all_seasons():
+    """Distinct seasons in the Match table, most recent first. Cached until the database changes."""
+    seasons_query = db.session.query(Match.season).distinct().all()
+    return tuple(_sort_seasons(s[0] for s in seasons_query if s[0]))
 
+def _sort_seasons(seasons):
     # attempt to sort seasons by the numeric year parsed from the first 4 digits
     # (e.g., '2015-16' -> 2015). Sort most recent first.
     def season_key(s):
-        try:
-            return -int(s.strip()[:4])
-        except Exception:
-            # fallback to lexicographic ordering for unparsable labels
-            return s
-    try:
-        seasons = sorted(seasons, key=season_key)
-    except (ValueError, TypeError):
-        pass
-    return seasons
-
-def compute_season_stats(season):
-    """Compute aggregate statistics for a given season string."""
-    season_matches = Match.query.filter_by(season=season).all()
+        year = s.strip()[:4]
+        if len(year) == 4 and year.isdecimal():
+            return (-int(year), s)
+        # unparsable labels go last, in lexicographic order
+        return (1, s)
+    return sorted(seasons, key=season_key)
+
+@memoize_on_data
+def _first_appearance_seasons():
+    """Map each player id to the earliest season they appeared in. Cached until the database changes."""
+    # grouped on Appearance.player_id directly, so the player table isn't joined
+    first_apps = db.session.query(Appearance.player_id, func.min(Match.season)).join(Match).group_by(Appearance.player_id).all()
+    return dict(first_apps)
+
+def compute_season_stats(season, all_seasons=None):
+    """Compute aggregate statistics for a given season string.
+
+    Callers that already hold the sorted season list can pass it as all_seasons.
+    """
+    # only the columns the match table shows, as plain rows
+    season_matches = db.session.query(
+        Match.id,
+        Match.date,
+        Match.opposition,
+        Match.location,
+        Match.result,
+        Match.guildford_points,
+        Match.opposition_points
+    ).filter(Match.season == season).order_by(Match.date, Match.id).all()
     if not season_matches:
         return None
 
     total_matches = len(season_matches)
-    
-    wins = draws = losses = 0
-    points_for = 0
-    points_against = 0
+
+    # results and points summed in SQL; anything not a win or draw is a loss
+    result_col = func.lower(Match.result)
+    wins, draws, points_for, points_against = db.session.query(
+        func.count().filter(result_col.like('win%')),
+        func.count().filter(result_col.like('draw%')),
+        func.sum(Match.guildford_points),
+        func.sum(Match.opposition_points)
+    ).filter(Match.season == season).one()
+    wins = wins or 0
+    draws = draws or 0
+    losses = total_matches - wins - draws
+    points_for = points_for or 0
+    points_against = points_against or 0
 
     # player counters for the season
     player_counts = {}
     shirt_counter = Counter()
 
-    for match in season_matches:
-        # result
-        r = (match.result or '').lower()
-        if r.startswith('win'):
-            wins += 1
-        elif r.startswith('draw'):
-            draws += 1
+    # find previous season up front so its players come from the same scan
+    if all_seasons is None:
+        all_seasons = _collect_seasons()
+    prev_season = get_previous_season(season, all_seasons)
+    scanned_seasons = [season, prev_season] if prev_season else [season]
+
+    # players: per-player starts/bench/total aggregated in SQL for this season and
+    # the previous one in a single grouped pass; the latter only feeds leavers
+    total_col = func.count(Appearance.id)
+    starts_col = func.count(Appearance.id).filter(Appearance.position <= 15)
+    player_rows = db.session.query(
+        Match.season,
+        Player.id,
+        Player.name,
+        starts_col,
+        func.count(Appearance.id).filter(Appearance.position > 15),
+        total_col
+    ).select_from(Appearance).join(Player).join(Match)\
+        .filter(Match.season.in_(scanned_seasons))\
+        .group_by(Match.season, Player.id, Player.name)\
+        .order_by(total_col.desc(), starts_col.desc(), Player.name)\
+        .all()
+    prev_players = set()
+    player_ids = {}
+    for row_season, player_id, name, starts, bench, total in player_rows:
+        if row_season == season:
+            player_counts[name] = {'starts': starts, 'bench': bench, 'total': total}
+            player_ids[name] = player_id
         else:
-            losses += 1
-
-        # points
-        points_for += match.guildford_points or 0
-        points_against += match.opposition_points or 0
-
-        # players
-        for ap in match.appearances:
-            name = ap.player.name
-            entry = player_counts.setdefault(name, {'starts': 0, 'bench': 0, 'total': 0})
-            if ap.position <= 15:
-                entry['starts'] += 1
-            else:
-                entry['bench'] += 1
-            entry['total'] += 1
-            shirt_counter[ap.position] += 1
+            prev_players.add(name)
+
+    shirt_rows = db.session.query(Appearance.position, func.count(Appearance.id))\
+        .join(Match)\
+        .filter(Match.season == season)\
+        .group_by(Appearance.position)\
+        .all()
+    shirt_counter.update(dict(shirt_rows))
 
     # average points for/against per match
     avg_points_for = round((points_for / total_matches)) if total_matches > 0 else 0
     avg_points_against = round((points_against / total_matches)) if total_matches > 0 else 0
     win_pct = (wins / total_matches * 100.0) if total_matches > 0 else 0.0
 
-    # leaderboard: sort by total desc, then starts desc, then name
-    leaderboard = sorted(player_counts.items(), key=lambda kv: (-kv[1].get('total', 0), -kv[1].get('starts', 0), kv[0]))
+    # leaderboard: total desc, then starts desc, then name -- already the SQL row order
+    leaderboard = list(player_counts.items())
 
     # total unique players used
     total_players_used = len(player_counts)
 
-    # Compute global first-appearance season for each player
-    first_appearance_season = {}
-    first_apps = db.session.query(Player.name, func.min(Match.season)).select_from(Player).join(Appearance).join(Match).group_by(Player.name).all()
-    for name, first_season in first_apps:
-        first_appearance_season[name] = first_season
-
-    # Debuts: players whose first appearance season is this season
-    debuts = [p for p in player_counts.keys() if first_appearance_season.get(p) == season]
+    # Debuts: players whose first appearance season (from the cached global map)
+    # is this season; seasons with no teamsheets entered skip the lookup
+    debuts = []
+    if player_counts:
+        first_appearance_season = _first_appearance_seasons()
+        debuts = [p for p, player_id in player_ids.items() if first_appearance_season.get(player_id) == season]
     debut_count = len(debuts)
     debut_pct = (debut_count / total_players_used * 100.0) if total_players_used > 0 else 0.0
 
-    # find previous season
-    all_seasons = _collect_seasons() 
-    prev_season = get_previous_season(season, all_seasons)
-
     leavers = []
     leavers_count = 0
     leavers_pct = 0.0
     if prev_season:
-        # players in previous season
-        prev_players = {p.name for p in Player.query.join(Appearance).join(Match).filter(Match.season == prev_season)}
-
         # players who were in prev season but not in this season
         leavers_set = prev_players - set(player_counts.keys())
         leavers = sorted(leavers_set)
@@ -136,13 +168,14 @@ def compute_season_stats(season):
         leavers_pct = (leavers_count / len(prev_players) * 100.0) if len(prev_players) > 0 else 0.0
 
     # shirt distribution list
+    total_shirts = sum(shirt_counter.values())
     shirt_dist = []
     for num, cnt in sorted(shirt_counter.items()):
-        pct = (cnt / sum(shirt_counter.values()) * 100.0) if shirt_counter else 0.0
+        pct = (cnt / total_shirts * 100.0) if total_shirts > 0 else 0.0
         shirt_dist.append({'num': num, 'count': cnt, 'pct': pct})
 
-    # match list (sorted by date)
-    match_list = sorted(season_matches, key=lambda m: m.date)
+    # match list (already sorted by date in SQL)
+    match_list = season_matches
 
     return {
         'season': season,
@@ -170,29 +203,42 @@ def compute_season_stats(season):
 
 def get_player_stats(name):
     """Compute per-player stats."""
-    player = Player.query.filter_by(name=name).first()
-    if not player:
-        return None
-
-    player_appearances = Appearance.query.filter_by(player_id=player.id).join(Match).order_by(Match.date.desc()).all()
+    # One Core select over appearance -> player -> match, filtered by name:
+    # plain rows with just the columns the page shows, no ORM objects
+    player_appearances = db.session.execute(
+        select(
+            Match.id.label('match_id'),
+            Match.date,
+            Match.season,
+            Match.opposition,
+            Match.location,
+            Match.result,
+            Match.guildford_points,
+            Match.opposition_points,
+            Appearance.position
+        ).select_from(Appearance)
+        .join(Player, Appearance.player_id == Player.id)
+        .join(Match, Appearance.match_id == Match.id)
+        .where(Player.name == name)
+        .order_by(Match.date.desc())
+    ).all()
     if not player_appearances:
         return None
 
+    # compute distribution by shirt number
+    shirt_counts = Counter(a.position for a in player_appearances)
+
     total_matches = len(player_appearances)
-    starts = sum(1 for a in player_appearances if a.position <= 15)
+    # starts/bench come from the (at most 20 entry) shirt histogram rather than
+    # another pass over every appearance
+    starts = sum(cnt for num, cnt in shirt_counts.items() if num <= 15)
     bench = total_matches - starts
-    wins = sum(1 for a in player_appearances if (a.match.result or '').lower() == 'win')
+    wins = sum(1 for a in player_appearances if (a.result or '').lower() == 'win')
     win_pct = (wins / total_matches * 100.0) if total_matches > 0 else 0.0
 
-    first_app = Appearance.query.filter_by(player_id=player.id).join(Match).order_by(Match.date.asc()).first()
-    last_app = Appearance.query.filter_by(player_id=player.id).join(Match).order_by(Match.date.desc()).first()
-    first_date = first_app.match.date if first_app else None
-    last_date = last_app.match.date if last_app else None
-
-    # compute distribution by shirt number
-    shirt_counts = Counter()
-    for a in player_appearances:
-        shirt_counts[a.position] += 1
+    # appearances are ordered newest first, so the ends give the date range
+    first_date = player_appearances[-1].date
+    last_date = player_appearances[0].date
 
     by_shirt = []
     for num, cnt in sorted(shirt_counts.items()):
@@ -211,15 +257,78 @@ def get_player_stats(name):
         'appearances': player_appearances, 
     }
 
+@memoize_on_data
+def get_all_player_names():
+    """Return every player name, sorted. Cached until the database changes."""
+    # Interned so the long-lived cached tables share one string object per name
+    return tuple(sys.intern(name) for (name,) in db.session.query(Player.name).order_by(Player.name))
+
 def find_potential_duplicates(player_names_to_check, all_player_names, threshold=90):
     """Checks a list of names against a list of known names for potential duplicates."""
-    errors = []
     known_names_set = set(all_player_names)
+    unknown_names = [name for name in player_names_to_check if name not in known_names_set]
+    if not unknown_names or not all_player_names:
+        return []
+
+    # Names that differ from a known one only by case or internal spacing are
+    # matched with a dict lookup; only the rest go through the fuzzy scorer
+    suggestions = {}
+    known_by_folded = {}
+    for known in all_player_names:
+        known_by_folded.setdefault(' '.join(known.casefold().split()), known)
+    fuzzy_names = []
+    for name in unknown_names:
+        exact = known_by_folded.get(' '.join(name.casefold().split()))
+        if exact is not None:
+            suggestions[name] = exact
+        else:
+            fuzzy_names.append(name)
+
+    if fuzzy_names:
+        # Score every remaining name against every known one in a single C
+        # call; score_cutoff zeroes weak candidates early, and argmax picks the
+        # first best match just as extractOne would
+        scores = fuzz_process.cdist([fuzz_utils.default_process(n) for n in fuzzy_names],
+                                    [fuzz_utils.default_process(n) for n in all_player_names],
+                                    scorer=fuzz.WRatio, processor=None, score_cutoff=threshold, workers=-1)
+        for name, row in zip(fuzzy_names, scores):
+            best = int(row.argmax())
+            if row[best] >= threshold:
+                suggestions[name] = all_player_names[best]
+
+    return [f"'{name}' is not an existing player. Did you mean '{suggestions[name]}'?"
+            for name in unknown_names if name in suggestions]
+
+@memoize_on_data
+def find_duplicate_groups(threshold=80):
+    """Group player names that look like the same person. Cached until the database changes.
+
+    Returns a tuple of groups, each a tuple of names in sorted order.
+    """
+    all_player_names = get_all_player_names()
+    if not all_player_names:
+        return ()
+
+    # Score every pair in one C call (scores under the threshold come back
+    # as 0). Each group starts from the first unassigned name and only takes
+    # names that match every member already in it, so a chain of near misses
+    # (A~B, B~C) can't pull unrelated players into one merge group
+    normalised_names = [fuzz_utils.default_process(n) for n in all_player_names]
+    scores = fuzz_process.cdist(normalised_names, normalised_names, scorer=fuzz.token_sort_ratio,
+                                processor=None, score_cutoff=threshold, dtype=np.uint8, workers=-1)
+    assigned = np.zeros(len(all_player_names), dtype=bool)
 
-    for name in player_names_to_check:
-        if name not in known_names_set:
-            if all_player_names:
-                best_match, score = fuzz_process.extractOne(name, all_player_names)
-                if score >= threshold:
-                    errors.append(f"'{name}' is not an existing player. Did you mean '{best_match}'?")
-    return errors
+    # names are sorted, so groups come out ordered by their first member
+    groups = []
+    for seed in range(len(all_player_names)):
+        if assigned[seed]:
+            continue
+        members = [seed]
+        for j in np.nonzero(scores[seed])[0]:
+            j = int(j)
+            if j > seed and not assigned[j] and scores[j, members].all():
+                members.append(j)
+        if len(members) > 1:
+            assigned[members] = True
+            groups.append(tuple(all_player_names[i] for i in members))
+    return tuple(groups)
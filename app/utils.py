@@ -1,6 +1,7 @@
-from functools import wraps
+import re
+from functools import wraps, lru_cache
 from flask import session, redirect, url_for, request
-from datetime import datetime
+from datetime import date
 
 def admin_required(f):
     @wraps(f)
@@ -10,15 +11,29 @@ def admin_required(f):
         return f(*args, **kwargs)
     return wrapper
 
+# Supported formats: dd/mm/yyyy, dd/mm/yy and yyyy-mm-dd (day and month may be one digit)
+_DMY_RE = re.compile(r'^(\d{1,2})/(\d{1,2})/(\d{4}|\d{2})$')
+_ISO_RE = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})$')
+
+@lru_cache(maxsize=4096)
 def parse_date_safe(s):
     if not s:
         return None
     s = s.strip()
     if not s:
         return None
-    for fmt in ("%d/%m/%Y", "%d/%m/%y", "%Y-%m-%d"):
-        try:
-            return datetime.strptime(s, fmt).date()
-        except Exception:
-            continue
-    return None
+    m = _DMY_RE.match(s)
+    if m:
+        day, month, year = (int(g) for g in m.groups())
+        if len(m.group(3)) == 2:
+            # same pivot as strptime's %y: 69-99 -> 1900s, 00-68 -> 2000s
+            year += 1900 if year >= 69 else 2000
+    else:
+        m = _ISO_RE.match(s)
+        if not m:
+            return None
+        year, month, day = (int(g) for g in m.groups())
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
@@ -5,18 +5,17 @@ from sqlalchemy import func
 
 app = create_app()
 with app.app_context():
+    # Only players one appearance short of a multiple of 50 come back
     stats = db.session.query(Player.name, func.count(Appearance.id))\
         .join(Appearance)\
         .group_by(Player.name)\
+        .having((func.count(Appearance.id) + 1) % 50 == 0)\
         .all()
     
     milestone_players = []
     for name, count in stats:
-        if (count + 1) % 50 == 0:
-            print(f"MILESTONE: {name} has {count} appearances (Next is {count+1})")
-            milestone_players.append(name)
-        elif count == 0: # Should not happen with join but theoretically
-            print(f"DEBUT: {name} has {count}")
+        print(f"MILESTONE: {name} has {count} appearances (Next is {count+1})")
+        milestone_players.append(name)
 
     if not milestone_players:
         # Create a dummy player with 49 appearances
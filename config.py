@@ -7,6 +7,19 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Room for a handful of threaded workers, and check connections before use
+    # so a server-side timeout doesn't surface as an error on the next request.
+    # create_app drops the pool sizing for in-memory SQLite, which uses a
+    # single shared connection (StaticPool) that takes no size arguments.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+    }
+    # WAL lets reads run alongside a write, but SQLite's docs rule it out on
+    # network filesystems, so it is opt-in for databases on local disk.
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', '').lower() in ('1', 'true', 'yes')
     
     # Custom config
     ADMIN_USER = os.environ.get('ADMIN_USER', 'admin')
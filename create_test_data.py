@@ -2,6 +2,7 @@ from app import create_app
 from app.extensions import db
 from app.models import Match, Player, Appearance
 from datetime import date
+from sqlalchemy import insert
 
 app = create_app()
 with app.app_context():
@@ -29,8 +30,8 @@ with app.app_context():
         # No unique constraint explicit in models.py shown, but usually implied. 
         # But let's create separate matches to be safe.
         
-        for i in range(needed):
-            m = Match(
+        matches = [
+            Match(
                 league="Test League",
                 season="2000-01", 
                 date=date(2000, 1, 1),
@@ -40,11 +41,14 @@ with app.app_context():
                 guildford_points=10,
                 opposition_points=0
             )
-            db.session.add(m)
-            db.session.flush() # get ID
-            
-            app_rec = Appearance(player_id=p.id, match_id=m.id, position=1)
-            db.session.add(app_rec)
+            for i in range(needed)
+        ]
+        db.session.add_all(matches)
+        db.session.flush() # get IDs for all matches at once
+        
+        db.session.execute(insert(Appearance), [
+            {'player_id': p.id, 'match_id': m.id, 'position': 1} for m in matches
+        ])
         
         db.session.commit()
         print(f"Added {needed} appearances.")